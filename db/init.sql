@@ -1,5 +1,7 @@
 -- ExamIntel Database Schema
--- This script runs automatically on first PostgreSQL container startup
+-- This script runs automatically on first PostgreSQL container startup.
+-- It is idempotent: re-run it against an existing database to apply schema upgrades
+-- (see "Database Initialization" in the README).
 
 -- Create users table
 CREATE TABLE IF NOT EXISTS users (
@@ -37,6 +39,28 @@ CREATE INDEX IF NOT EXISTS idx_recovery_plans_user_id ON recovery_plans(user_id)
 CREATE INDEX IF NOT EXISTS idx_recovery_plans_assessment_id ON recovery_plans(assessment_id);
 CREATE INDEX IF NOT EXISTS idx_recovery_plans_created_at ON recovery_plans(created_at DESC);
 
+-- Upgrade: equality-only lookup columns use hash indexes (a 4-byte hash code per row instead of
+-- the 64-char key). CREATE INDEX IF NOT EXISTS below won't replace an existing btree index of
+-- the same name, so drop those first and let them be recreated.
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexname FROM pg_indexes
+        WHERE schemaname = current_schema()
+          AND indexname IN (
+              'idx_documents_source_fingerprint',
+              'idx_user_documents_document_sha256',
+              'idx_papers_document_sha256',
+              'idx_document_chunks_document_sha256'
+          )
+          AND indexdef NOT ILIKE '%USING hash%'
+    LOOP
+        EXECUTE format('DROP INDEX %I', idx.indexname);
+    END LOOP;
+END $$;
+
 -- Create documents table for tracking uploaded PDFs
 CREATE TABLE IF NOT EXISTS documents (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -45,12 +69,18 @@ CREATE TABLE IF NOT EXISTS documents (
     total_pages INTEGER NOT NULL,
     upload_source TEXT NOT NULL,  -- 'url' or 'file'
     source_url TEXT,  -- URL if uploaded via URL
+    source_fingerprint TEXT,  -- Hash of (url, ETag, Last-Modified, length) for pre-download dedup
     status TEXT DEFAULT 'processing',  -- 'processing', 'completed', 'failed'
     error_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256_hash);
+-- Upgrade: databases created before source fingerprints existed
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS source_fingerprint TEXT;
+
+-- sha256_hash lookups use the btree behind its UNIQUE constraint; a separate index only adds write cost
+DROP INDEX IF EXISTS idx_documents_sha256;
+CREATE INDEX IF NOT EXISTS idx_documents_source_fingerprint ON documents USING HASH (source_fingerprint) WHERE source_fingerprint IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status);
 CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at DESC);
 
@@ -64,7 +94,7 @@ CREATE TABLE IF NOT EXISTS user_documents (
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_documents_user_id ON user_documents(user_id);
-CREATE INDEX IF NOT EXISTS idx_user_documents_document_sha256 ON user_documents(document_sha256);
+CREATE INDEX IF NOT EXISTS idx_user_documents_document_sha256 ON user_documents USING HASH (document_sha256);
 CREATE INDEX IF NOT EXISTS idx_user_documents_linked_at ON user_documents(linked_at DESC);
 
 -- Create papers table to store exam paper metadata within a document
@@ -83,7 +113,7 @@ CREATE TABLE IF NOT EXISTS papers (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_papers_document_sha256 ON papers(document_sha256);
+CREATE INDEX IF NOT EXISTS idx_papers_document_sha256 ON papers USING HASH (document_sha256);
 
 -- Create document_chunks table for tracking PDF splits
 CREATE TABLE IF NOT EXISTS document_chunks (
@@ -92,13 +122,13 @@ CREATE TABLE IF NOT EXISTS document_chunks (
     chunk_number INTEGER NOT NULL,  -- 1, 2, 3...
     page_range_start INTEGER NOT NULL,
     page_range_end INTEGER NOT NULL,
-    qdrant_point_id TEXT,  -- UUID in Qdrant vector DB
+    qdrant_point_id BIGINT,  -- Integer point ID in Qdrant vector DB (older databases keep TEXT; bigint values cast on insert)
     text_content TEXT,  -- Extracted text
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(document_sha256, chunk_number)
 );
 
-CREATE INDEX IF NOT EXISTS idx_document_chunks_document_sha256 ON document_chunks(document_sha256);
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document_sha256 ON document_chunks USING HASH (document_sha256);
 CREATE INDEX IF NOT EXISTS idx_document_chunks_qdrant_point_id ON document_chunks(qdrant_point_id);
 
 -- Create ingestion_jobs table for tracking document processing
@@ -130,11 +160,13 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+DROP TRIGGER IF EXISTS update_recovery_plans_updated_at ON recovery_plans;
 CREATE TRIGGER update_recovery_plans_updated_at 
     BEFORE UPDATE ON recovery_plans 
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_ingestion_jobs_updated_at ON ingestion_jobs;
 CREATE TRIGGER update_ingestion_jobs_updated_at 
     BEFORE UPDATE ON ingestion_jobs 
     FOR EACH ROW 
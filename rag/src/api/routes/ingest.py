@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from src.services.ingestion_service import create_job, get_job_status, get_system_stats
-from src.pipelines.ingest_pipeline import run_ingestion_pipeline
+from src.pipelines.ingest_pipeline import submit_ingestion_job
 from src.config import config
 
 router = APIRouter()
@@ -16,7 +16,7 @@ class JobResponse(BaseModel):
     status: str
 
 @router.get("/ingest/stats")
-async def get_stats():
+def get_stats():
     """Get system statistics, including unique document count (SHA256)"""
     try:
         stats = get_system_stats()
@@ -26,10 +26,7 @@ async def get_stats():
 
 
 @router.post("/ingest/url", response_model=JobResponse)
-async def ingest_url(
-    background_tasks: BackgroundTasks,
-    request: IngestUrlRequest
-):
+def ingest_url(request: IngestUrlRequest):
     """Ingest from URLs"""
     if not request.urls:
         raise HTTPException(status_code=400, detail="No URLs provided")
@@ -38,12 +35,12 @@ async def ingest_url(
     
     sources = [{'type': 'url', 'value': url} for url in request.urls]
     
-    background_tasks.add_task(run_ingestion_pipeline, job_id, request.user_id, sources)
+    submit_ingestion_job(job_id, request.user_id, sources)
     
     return {"job_id": job_id, "status": "processing"}
 
 @router.get("/ingest/status/{job_id}")
-async def job_status(job_id: str):
+def job_status(job_id: str):
     """Get ingestion job status"""
     status = get_job_status(job_id)
     if not status:
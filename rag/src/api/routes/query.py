@@ -8,6 +8,11 @@ from src.services.vector_service import search_vectors
 from src.services.embedding_service import embed_texts
 from src.services.ingestion_service import get_user_documents
 from src.clients.redis_client import cache_get, cache_set
+from src.clients.gemini_client import generate_content_with_retry
+from google.genai import types
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -21,17 +26,23 @@ class QueryResponse(BaseModel):
     results: List[Dict[str, Any]]
     analysis: Optional[Dict[str, Any]] = None
 
+class QueryAnalysis(BaseModel):
+    """Response schema for the Gemini analysis of retrieved excerpts"""
+    topics: List[str]
+    insights: str
+    difficulty: str
+
 @router.post("/query", response_model=QueryResponse)
-async def search(request: QueryRequest):
+def search(request: QueryRequest):
     """
     Semantic search over ingested papers (user-specific)
     """
     try:
-        print(f"Query endpoint called - user: {request.user_id}, subject: {request.subject}, query: {request.query[:50]}...")
+        logger.info(f"Query endpoint called - user: {request.user_id}, subject: {request.subject}, query: {request.query[:50]}...")
         
         # Get user's accessible documents
         user_documents = get_user_documents(request.user_id)
-        print(f"User {request.user_id} has access to {len(user_documents)} documents: {user_documents[:5] if user_documents else 'none'}")
+        logger.info(f"User {request.user_id} has access to {len(user_documents)} documents: {user_documents[:5] if user_documents else 'none'}")
         
         # Generate cache key from query + sorted user documents
         sorted_docs = sorted(user_documents) if user_documents else []
@@ -49,7 +60,7 @@ async def search(request: QueryRequest):
             return cached_result
         
         if not user_documents:
-            print(f"No documents found for user {request.user_id}. Returning empty results.")
+            logger.info(f"No documents found for user {request.user_id}. Returning empty results.")
             return {
                 "results": [],
                 "analysis": {
@@ -114,9 +125,6 @@ async def search(request: QueryRequest):
         analysis = None
         if formatted_results:
             try:
-                from src.clients.gemini_client import generate_content_with_retry
-                from google.genai import types
-
                 # Construct context
                 context_parts = []
                 for i, r in enumerate(formatted_results):
@@ -149,13 +157,17 @@ async def search(request: QueryRequest):
                 response = generate_content_with_retry(
                     model=config.GEMINI_GENERATION_MODEL,
                     contents=[analysis_prompt],
-                    config=types.GenerateContentConfig(response_mime_type="application/json")
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        response_schema=QueryAnalysis
+                    )
                 )
                 
-                if response and response.text:
+                if response and response.parsed is not None:
+                    analysis = response.parsed.model_dump()
+                elif response and response.text:
                     try:
-                        clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                        analysis = json.loads(clean_text)
+                        analysis = json.loads(response.text)
                     except json.JSONDecodeError:
                          analysis = {
                             "topics": ["Error parsing analysis"],
@@ -164,7 +176,7 @@ async def search(request: QueryRequest):
                          }
 
             except Exception as e:
-                print(f"Analysis generation failed: {e}")
+                logger.error(f"Analysis generation failed: {e}")
                 analysis = {
                     "topics": [],
                     "insights": "Analysis service unavailable.",
@@ -182,5 +194,5 @@ async def search(request: QueryRequest):
         return result
 
     except Exception as e:
-        print(f"Query error: {e}")
+        logger.error(f"Query error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,52 +1,127 @@
 import time
 import random
+import threading
+import httpx
 from typing import Optional
 from functools import wraps
 from google import genai
 from google.genai import types
 from src.config import config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 _client = None
+_client_lock = threading.Lock()
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts up to capacity and refills at a
+    steady rate. A rate of 0 disables limiting.
+    """
+    def __init__(self, per_minute: int, capacity: Optional[int] = None):
+        self.refill_rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else max(1, per_minute // 10))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is available"""
+        if self.refill_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+            self.last_refill = now
+            self.tokens -= 1
+            # A negative balance is this caller's wait; later callers queue behind it
+            wait_time = -self.tokens / self.refill_rate if self.tokens < 0 else 0.0
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+# Separate budgets: embedding traffic must not consume the generate quota, or vice versa
+_generate_bucket = TokenBucket(config.GEMINI_GENERATE_RPM)
+_embed_bucket = TokenBucket(config.GEMINI_EMBED_RPM)
 
 def get_gemini_client() -> genai.Client:
     """Get or create singleton Gemini client"""
     global _client
     if _client is None:
-        if not config.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        _client = genai.Client(api_key=config.GEMINI_API_KEY)
+        # Extraction workers can race here on the first document
+        with _client_lock:
+            if _client is None:
+                if not config.GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY environment variable not set")
+                # Keep-alive pool sized for every thread that can call Gemini at once:
+                # extraction/embedding workers in each concurrent ingestion job
+                pool_size = config.GEMINI_CONCURRENCY * config.INGEST_WORKERS + config.GEMINI_CONCURRENCY
+                _client = genai.Client(
+                    api_key=config.GEMINI_API_KEY,
+                    http_options=types.HttpOptions(
+                        timeout=config.GEMINI_TIMEOUT_MS,
+                        client_args={
+                            'limits': httpx.Limits(
+                                max_connections=pool_size,
+                                max_keepalive_connections=pool_size,
+                                keepalive_expiry=60
+                            )
+                        }
+                    )
+                )
     return _client
 
-def generate_content_with_retry(
-    model: str, 
-    contents: list, 
-    config: Optional[types.GenerateContentConfig] = None, 
-    retries: int = 5, 
-    initial_delay: float = 2.0
-):
-    """
-    Call Gemini generate_content with exponential backoff for 503/429 errors.
-    Wrapper around the client method.
-    """
-    client = get_gemini_client()
+def _is_retryable_error(e: Exception) -> bool:
+    """Rate-limit and availability errors that are worth retrying with backoff"""
+    error_str = str(e)
+    return "503" in error_str or "UNAVAILABLE" in error_str or "429" in error_str
+
+def is_invalid_argument_error(e: Exception) -> bool:
+    """Errors where the API rejected the input itself; retrying the same request won't help"""
+    error_str = str(e)
+    return "400" in error_str or "INVALID_ARGUMENT" in error_str
+
+def _call_with_retry(call, bucket: TokenBucket, retries: int, initial_delay: float):
+    """Run a Gemini call under its rate limit with exponential backoff for 503/429 errors"""
     delay = initial_delay
     
     for attempt in range(retries):
         try:
-            return client.models.generate_content(
-                model=model,
-                contents=contents,
-                config=config
-            )
+            bucket.acquire()
+            return call()
         except Exception as e:
-            error_str = str(e)
-            if "503" in error_str or "UNAVAILABLE" in error_str or "429" in error_str:
+            if _is_retryable_error(e):
                 if attempt == retries - 1:
                     raise  # Re-raise on last attempt
                 
                 wait_time = delay + random.uniform(0, 1)
-                print(f"Gemini API busy (503/429). Retrying in {wait_time:.2f}s... (Attempt {attempt + 1}/{retries})")
+                logger.warning(f"Gemini API busy (503/429). Retrying in {wait_time:.2f}s... (Attempt {attempt + 1}/{retries})")
                 time.sleep(wait_time)
                 delay *= 2  # Exponential backoff
             else:
                 raise  # Re-raise other errors immediately
+
+def generate_content_with_retry(
+    model: str, 
+    contents: list, 
+    config: Optional[types.GenerateContentConfig] = None, 
+    retries: int = 5, 
+    initial_delay: float = 2.0
+):
+    """
+    Call Gemini generate_content with exponential backoff for 503/429 errors.
+    Wrapper around the client method.
+    """
+    client = get_gemini_client()
+    return _call_with_retry(
+        lambda: client.models.generate_content(model=model, contents=contents, config=config),
+        _generate_bucket, retries, initial_delay
+    )
+
+def embed_content(model: str, contents: list, retries: int = 5, initial_delay: float = 2.0):
+    """Call Gemini embed_content under the embedding rate limit, with the same 503/429 backoff"""
+    client = get_gemini_client()
+    return _call_with_retry(
+        lambda: client.models.embed_content(model=model, contents=contents),
+        _embed_bucket, retries, initial_delay
+    )
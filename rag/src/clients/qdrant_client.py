@@ -1,23 +1,39 @@
+import threading
 from qdrant_client import QdrantClient
 from src.config import config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
 
 def get_qdrant_client() -> QdrantClient:
-    """Create and return a Qdrant client instance"""
-    try:
-        if config.QDRANT_API_KEY:
-            client = QdrantClient(
-                host=config.QDRANT_HOST,
-                port=config.QDRANT_PORT,
-                api_key=config.QDRANT_API_KEY,
-                https=False,
-            )
-        else:
-            client = QdrantClient(
-                host=config.QDRANT_HOST,
-                port=config.QDRANT_PORT,
-                https=False,
-            )
-        return client
-    except Exception as e:
-        print(f"Failed to connect to Qdrant: {e}")
-        raise
+    """Get or create singleton Qdrant client (shared gRPC channel / HTTP pool)"""
+    global _client
+    if _client is None:
+        # Ingestion jobs and query requests can race here on startup
+        with _client_lock:
+            if _client is None:
+                try:
+                    if config.QDRANT_API_KEY:
+                        _client = QdrantClient(
+                            host=config.QDRANT_HOST,
+                            port=config.QDRANT_PORT,
+                            grpc_port=config.QDRANT_GRPC_PORT,
+                            prefer_grpc=config.QDRANT_PREFER_GRPC,
+                            api_key=config.QDRANT_API_KEY,
+                            https=False,
+                        )
+                    else:
+                        _client = QdrantClient(
+                            host=config.QDRANT_HOST,
+                            port=config.QDRANT_PORT,
+                            grpc_port=config.QDRANT_GRPC_PORT,
+                            prefer_grpc=config.QDRANT_PREFER_GRPC,
+                            https=False,
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to connect to Qdrant: {e}")
+                    raise
+    return _client
@@ -1,7 +1,10 @@
 import redis
 import json
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 from src.config import config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 _redis_client = None
 
@@ -23,9 +26,9 @@ def get_redis_client() -> Optional[redis.Redis]:
                 socket_timeout=2
             )
             _redis_client.ping()
-            print(f"Connected to Redis at {config.REDIS_HOST}:{config.REDIS_PORT}")
+            logger.info(f"Connected to Redis at {config.REDIS_HOST}:{config.REDIS_PORT}")
         except Exception as e:
-            print(f"Failed to connect to Redis: {e}")
+            logger.error(f"Failed to connect to Redis: {e}")
             _redis_client = None
     
     return _redis_client
@@ -42,11 +45,45 @@ def cache_get(key: str) -> Optional[Any]:
             return json.loads(value)
         return None
     except Exception as e:
-        print(f"Cache get error: {e}")
+        logger.error(f"Cache get error: {e}")
         return None
 
-def cache_set(key: str, value: Any, ttl: int = None) -> bool:
-    """Set value in cache with optional TTL"""
+def cache_set(key: str, value: Any, ttl: int = None, nx: bool = False) -> bool:
+    """
+    Set value in cache with optional TTL.
+    With nx=True the value is only stored if the key is absent.
+    """
+    try:
+        client = get_redis_client()
+        if not client:
+            return False
+        
+        if ttl is None:
+            ttl = config.CACHE_TTL
+        
+        return bool(client.set(key, json.dumps(value), ex=ttl, nx=nx))
+    except Exception as e:
+        logger.error(f"Cache set error: {e}")
+        return False
+
+def cache_get_many(keys: List[str]) -> List[Optional[Any]]:
+    """Get multiple values from cache in a single round-trip"""
+    if not keys:
+        return []
+    try:
+        client = get_redis_client()
+        if not client:
+            return [None] * len(keys)
+        
+        return [json.loads(value) if value else None for value in client.mget(keys)]
+    except Exception as e:
+        logger.error(f"Cache get_many error: {e}")
+        return [None] * len(keys)
+
+def cache_set_many(items: Dict[str, Any], ttl: int = None) -> bool:
+    """Set multiple values in cache with optional TTL in a single round-trip"""
+    if not items:
+        return True
     try:
         client = get_redis_client()
         if not client:
@@ -55,10 +92,13 @@ def cache_set(key: str, value: Any, ttl: int = None) -> bool:
         if ttl is None:
             ttl = config.CACHE_TTL
         
-        client.setex(key, ttl, json.dumps(value))
+        pipe = client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, ttl, json.dumps(value))
+        pipe.execute()
         return True
     except Exception as e:
-        print(f"Cache set error: {e}")
+        logger.error(f"Cache set_many error: {e}")
         return False
 
 def cache_delete(key: str) -> bool:
@@ -71,7 +111,7 @@ def cache_delete(key: str) -> bool:
         client.delete(key)
         return True
     except Exception as e:
-        print(f"Cache delete error: {e}")
+        logger.error(f"Cache delete error: {e}")
         return False
 
 def invalidate_pattern(pattern: str) -> int:
@@ -86,5 +126,5 @@ def invalidate_pattern(pattern: str) -> int:
             return client.delete(*keys)
         return 0
     except Exception as e:
-        print(f"Cache invalidate error: {e}")
+        logger.error(f"Cache invalidate error: {e}")
         return 0
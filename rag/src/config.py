@@ -1,21 +1,62 @@
 import os
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 load_dotenv()
 
+PGBOUNCER_DEFAULT_PORT = 6432
+
+def _prepared_statements_enabled(setting: str, dsn: str) -> bool:
+    """
+    "true"/"false" are taken as given; "auto" disables prepared statements when
+    the DSN points at PgBouncer, whose transaction pooling can run EXECUTE on a
+    different server connection than the one that ran PREPARE
+    """
+    if setting != "auto":
+        return setting == "true"
+    try:
+        parsed = urlparse(dsn or "")
+        via_pgbouncer = parsed.port == PGBOUNCER_DEFAULT_PORT or "pgbouncer" in (parsed.hostname or "")
+    except ValueError:
+        via_pgbouncer = False
+    return not via_pgbouncer
+
 class Config:
     # Qdrant Configuration
     QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "") or None
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"  # Protobuf over HTTP/2 instead of JSON REST
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_UPLOAD_PARALLEL = int(os.getenv("QDRANT_UPLOAD_PARALLEL", "1"))  # >1 uploads batches from worker processes
     
     # Gemini Configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_GENERATION_MODEL = os.getenv("GEMINI_GENERATION_MODEL", "gemini-2.5-flash")
     GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))  # Texts per embed_content request
+    EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32").lower()  # float32 or int8 (lossy, 4x smaller)
+    GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "6"))  # Parallel extraction calls per document
+    GEMINI_GENERATE_RPM = int(os.getenv("GEMINI_GENERATE_RPM", "0"))  # Client-side generate_content rate limit, 0 = unlimited
+    GEMINI_EMBED_RPM = int(os.getenv("GEMINI_EMBED_RPM", "0"))  # Client-side embed_content rate limit, 0 = unlimited
+    GEMINI_TIMEOUT_MS = int(os.getenv("GEMINI_TIMEOUT_MS", "120000"))  # Per-request HTTP timeout
+    PAPER_DETECTION_MAX_TOKENS = int(os.getenv("PAPER_DETECTION_MAX_TOKENS", "100000"))  # Input budget for paper detection
     
     # Database Configuration
     DATABASE_URL = os.getenv("DATABASE_URL")
+    PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+    PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "5"))
+    PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))  # Seconds to wait for a free pooled connection
+    PG_PREPARED_STATEMENTS = _prepared_statements_enabled(
+        os.getenv("PG_PREPARED_STATEMENTS", "auto").lower(), DATABASE_URL
+    )  # true, false, or auto (off when DATABASE_URL points at PgBouncer)
+    
+    # Ingestion Configuration
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # Concurrent ingestion jobs per process
+    DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "8"))  # Parallel source downloads per job
+    PAGES_PER_CHUNK = int(os.getenv("PAGES_PER_CHUNK", "8"))  # Pages sent to Gemini per extraction call
+    JOB_PROGRESS_FLUSH_SECONDS = float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "2"))  # Max delay before job progress reaches the DB
+    JOB_PROGRESS_FLUSH_SOURCES = int(os.getenv("JOB_PROGRESS_FLUSH_SOURCES", "10"))  # Flush progress after this many sources regardless
     
     # Vector Configuration
     VECTOR_SIZE = int(os.getenv("VECTOR_SIZE", "3072"))
@@ -32,6 +73,9 @@ class Config:
     RESEND_API_KEY = os.getenv("RESEND_API_KEY")
     EMAIL_FROM = os.getenv("EMAIL_FROM", "noreply@notifications.thebuildguild.dev")
     
+    # Logging Configuration
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
     CORS_ALLOW_CREDENTIALS = os.getenv("CORS_ALLOW_CREDENTIALS", "true").lower() == "true"
@@ -1,26 +1,66 @@
 import requests
 import os
 import uuid
+import hashlib
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse, unquote
 from typing import Optional, Tuple
+from src.utils.hashing import HASH_BLOCK_SIZE
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def download_pdf(url: str, output_dir: str) -> Optional[Tuple[str, str]]:
+# Shared session so batches of URLs from the same host reuse TCP/TLS connections
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+def fetch_source_fingerprint(url: str) -> Optional[str]:
+    """
+    Build a surrogate content key for a URL from a HEAD request
+    Returns: hex fingerprint of (url, etag, last-modified, length) or None if
+    the server does not send a stable validator (ETag or Last-Modified)
+    """
+    try:
+        response = _session.head(url, timeout=15, allow_redirects=True, verify=False)
+        response.raise_for_status()
+        
+        etag = response.headers.get('etag', '')
+        last_modified = response.headers.get('last-modified', '')
+        if not etag and not last_modified:
+            return None
+        
+        content_length = response.headers.get('content-length', '')
+        key = "\n".join([url, etag, last_modified, content_length])
+        return hashlib.sha256(key.encode()).hexdigest()
+    
+    except Exception as e:
+        logger.warning(f"HEAD request failed for {url}: {e}")
+        return None
+
+def download_pdf(url: str, output_dir: str) -> Optional[Tuple[str, str, str]]:
     """
-    Download PDF from URL
-    Returns: (file_path, original_filename) or None if failed
+    Download PDF from URL, hashing it as it is written
+    Returns: (file_path, original_filename, sha256) or None if failed
     """
     try:
-        print(f"Downloading PDF from {url}")
-        response = requests.get(url, timeout=60, stream=True, verify=False)
+        logger.info(f"Downloading PDF from {url}")
+        response = _session.get(url, timeout=60, stream=True, verify=False)
         response.raise_for_status()
         
         # Check content type
         content_type = response.headers.get('content-type', '').lower()
         if 'application/pdf' not in content_type and not url.lower().endswith('.pdf'):
-            print(f"Invalid content type: {content_type}")
+            logger.warning(f"Invalid content type: {content_type}")
             return None
         
         # Extract filename from URL or generate one
@@ -32,14 +72,16 @@ def download_pdf(url: str, output_dir: str) -> Optional[Tuple[str, str]]:
         
         # Save to temp directory
         file_path = os.path.join(output_dir, filename)
+        sha256_hash = hashlib.sha256()
         with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=HASH_BLOCK_SIZE):
                 if chunk:
                     f.write(chunk)
+                    sha256_hash.update(chunk)
         
-        print(f"Downloaded: {filename} ({os.path.getsize(file_path)} bytes)")
-        return file_path, filename
+        logger.info(f"Downloaded: {filename} ({os.path.getsize(file_path)} bytes)")
+        return file_path, filename, sha256_hash.hexdigest()
     
     except Exception as e:
-        print(f"Download failed for {url}: {e}")
+        logger.error(f"Download failed for {url}: {e}")
         return None
@@ -0,0 +1,7 @@
+import threading
+
+# PDFium is not thread-safe and pypdfium2 does not serialize calls into it, so no two
+# threads in a process may use it at once, even on different documents. Every
+# in-process pypdfium2 call (validator, splitter) runs under this lock; the split
+# process pool workers are single-threaded and don't need it.
+PDFIUM_LOCK = threading.Lock()
@@ -1,9 +1,52 @@
 import os
-import PyPDF2
+import threading
+import multiprocessing
+import pypdfium2 as pdfium
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 from pathlib import Path
+from src.config import config
+from src.document.pdfium_lock import PDFIUM_LOCK
+from src.utils.logger import get_logger
 
-PAGES_PER_CHUNK = 8  # Split PDFs into 8-page chunks
+logger = get_logger(__name__)
+
+PAGES_PER_CHUNK = config.PAGES_PER_CHUNK  # Split PDFs into fixed-size page chunks (8 by default)
+PARALLEL_SPLIT_MIN_CHUNKS = 16  # Below this, process start-up costs more than it saves
+
+_split_executor = None
+_split_executor_lock = threading.Lock()
+
+def _get_split_executor() -> ProcessPoolExecutor:
+    """Get or create the shared process pool for chunk writes"""
+    global _split_executor
+    if _split_executor is None:
+        with _split_executor_lock:
+            if _split_executor is None:
+                # spawn: forking a process that holds PDFium and worker threads is unsafe
+                _split_executor = ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _split_executor
+
+def _write_chunk(pdf_reader, start_page: int, end_page: int, chunk_path: str):
+    """Copy pages [start_page, end_page) of an open document into a new PDF"""
+    pdf_writer = pdfium.PdfDocument.new()
+    try:
+        # Native page copy, no re-parsing
+        pdf_writer.import_pages(pdf_reader, pages=list(range(start_page, end_page)))
+        pdf_writer.save(chunk_path)
+    finally:
+        pdf_writer.close()
+
+def _write_chunk_from_file(file_path: str, start_page: int, end_page: int, chunk_path: str):
+    """Process pool entry point: each worker opens the source PDF itself"""
+    pdf_reader = pdfium.PdfDocument(file_path)
+    try:
+        _write_chunk(pdf_reader, start_page, end_page, chunk_path)
+    finally:
+        pdf_reader.close()
 
 def split_pdf(file_path: str, output_dir: str, pages_per_chunk: int = PAGES_PER_CHUNK) -> List[Dict[str, any]]:
     """
@@ -11,51 +54,58 @@ def split_pdf(file_path: str, output_dir: str, pages_per_chunk: int = PAGES_PER_
     Returns: List of dicts with {path, chunk_number, page_start, page_end}
     """
     try:
-        with open(file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            total_pages = len(pdf_reader.pages)
-            
-            if total_pages <= pages_per_chunk:
-                # No splitting needed
-                return [{
-                    'path': file_path,
-                    'chunk_number': 1,
-                    'page_start': 1,
-                    'page_end': total_pages,
-                }]
-            
-            # Split into chunks
-            chunks = []
-            base_name = Path(file_path).stem
-            
-            chunk_number = 1
-            for start_page in range(0, total_pages, pages_per_chunk):
-                end_page = min(start_page + pages_per_chunk, total_pages)
-                
-                # Create new PDF for this chunk
-                pdf_writer = PyPDF2.PdfWriter()
-                for page_num in range(start_page, end_page):
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-                
-                # Save chunk
-                chunk_filename = f"{base_name}-part{chunk_number}.pdf"
-                chunk_path = os.path.join(output_dir, chunk_filename)
-                
-                with open(chunk_path, 'wb') as chunk_f:
-                    pdf_writer.write(chunk_f)
-                
-                chunks.append({
-                    'path': chunk_path,
-                    'chunk_number': chunk_number,
-                    'page_start': start_page + 1,  # 1-indexed
-                    'page_end': end_page,
-                })
-                
-                print(f"Created chunk {chunk_number}: pages {start_page + 1}-{end_page}")
-                chunk_number += 1
-            
-            return chunks
-    
+        with PDFIUM_LOCK:
+            pdf_reader = pdfium.PdfDocument(file_path)
+            try:
+                total_pages = len(pdf_reader)
+
+                if total_pages <= pages_per_chunk:
+                    # No splitting needed
+                    return [{
+                        'path': file_path,
+                        'chunk_number': 1,
+                        'page_start': 1,
+                        'page_end': total_pages,
+                    }]
+
+                # Plan chunks
+                chunks = []
+                base_name = Path(file_path).stem
+
+                for chunk_number, start_page in enumerate(range(0, total_pages, pages_per_chunk), start=1):
+                    end_page = min(start_page + pages_per_chunk, total_pages)
+                    chunk_filename = f"{base_name}-part{chunk_number}.pdf"
+
+                    chunks.append({
+                        'path': os.path.join(output_dir, chunk_filename),
+                        'chunk_number': chunk_number,
+                        'page_start': start_page + 1,  # 1-indexed
+                        'page_end': end_page,
+                    })
+
+                parallel = len(chunks) >= PARALLEL_SPLIT_MIN_CHUNKS
+                if not parallel:
+                    for chunk in chunks:
+                        _write_chunk(pdf_reader, chunk['page_start'] - 1, chunk['page_end'], chunk['path'])
+            finally:
+                pdf_reader.close()
+
+        # Large documents fan out across CPU cores; the lock is released so other
+        # jobs can use PDFium while the worker processes write
+        if parallel:
+            list(_get_split_executor().map(
+                _write_chunk_from_file,
+                [file_path] * len(chunks),
+                [chunk['page_start'] - 1 for chunk in chunks],
+                [chunk['page_end'] for chunk in chunks],
+                [chunk['path'] for chunk in chunks]
+            ))
+
+        for chunk in chunks:
+            logger.info(f"Created chunk {chunk['chunk_number']}: pages {chunk['page_start']}-{chunk['page_end']}")
+
+        return chunks
+
     except Exception as e:
-        print(f"PDF splitting failed: {e}")
+        logger.error(f"PDF splitting failed: {e}")
         raise
@@ -1,6 +1,18 @@
 import os
-import PyPDF2
+import pypdfium2 as pdfium
 from typing import Optional
+from src.document.pdfium_lock import PDFIUM_LOCK
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PDF_HEADER = b"%PDF-"
+PDF_HEADER_SEARCH_BYTES = 1024  # Readers accept the header anywhere in the first 1 KB
+
+def _has_pdf_header(file_path: str) -> bool:
+    """Cheap pre-check so non-PDF downloads are rejected before PDFium parses them"""
+    with open(file_path, "rb") as f:
+        return PDF_HEADER in f.read(PDF_HEADER_SEARCH_BYTES)
 
 def validate_pdf(file_path: str) -> Optional[int]:
     """
@@ -8,17 +20,25 @@ def validate_pdf(file_path: str) -> Optional[int]:
     Returns: page_count or None if invalid/corrupted
     """
     try:
-        with open(file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            page_count = len(pdf_reader.pages)
-            
-            # Try reading first page to ensure it's not corrupted
-            if page_count > 0:
-                _ = pdf_reader.pages[0].extract_text()
-            
-            print(f"Valid PDF: {page_count} pages")
-            return page_count
+        if not _has_pdf_header(file_path):
+            logger.error(f"PDF validation failed: no {PDF_HEADER.decode()} header in {file_path}")
+            return None
+
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                page_count = len(pdf)
+                
+                # Load the first page to ensure it's not corrupted; its text isn't
+                # needed here (extraction happens per chunk), so skip the text layer
+                if page_count > 0:
+                    pdf[0].close()
+            finally:
+                pdf.close()
+        
+        logger.info(f"Valid PDF: {page_count} pages")
+        return page_count
     
     except Exception as e:
-        print(f"PDF validation failed: {e}")
+        logger.error(f"PDF validation failed: {e}")
         return None
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
 class PaperMetadata(BaseModel):
@@ -13,3 +13,15 @@ class Paper(BaseModel):
     id: Optional[str] = None 
     metadata: PaperMetadata
     chunk_ids: list[str] = Field(default_factory=list)
+
+class DetectedPaper(BaseModel):
+    """Response schema for paper detection; mirrors the fields requested in the prompt"""
+    subject: Optional[str] = None
+    year: Optional[int] = None
+    semester: Optional[str] = None
+    paper_code: Optional[str] = None
+    exam_type: Optional[str] = None
+    start_page: Optional[int] = None
+    end_page: Optional[int] = None
+    topics: List[str] = Field(default_factory=list)
+    difficulty: Optional[str] = None
@@ -1,27 +1,129 @@
 import os
-import uuid
 import tempfile
 import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from src.config import config
+
 # Document modules
-from src.document.downloader import download_pdf
+from src.document.downloader import download_pdf, fetch_source_fingerprint
 from src.document.validator import validate_pdf
 from src.document.splitter import split_pdf
-from src.utils.hashing import compute_sha256
-from src.utils.file_utils import create_temp_dir, cleanup_directory
+from src.utils.file_utils import create_temp_dir, cleanup_directory_async, sweep_stale_temp_dirs
+from src.utils.ids import chunk_point_id
+from src.utils.page_mapper import build_paper_ranges, find_overlapping_papers
 
 # Services
-from src.services.gemini_extraction_service import extract_text_from_chunk
+from src.services.gemini_extraction_service import extract_texts_from_chunks
 from src.services.metadata_service import detect_exam_papers
 from src.services.embedding_service import embed_texts
 from src.services.vector_service import ensure_collection, upsert_vectors
 from src.services.ingestion_service import (
-    update_job_status, check_document_exists, link_document_to_user, 
-    save_document_metadata, save_chunk_metadata, save_papers, get_user_email
+    update_job_status, bump_job, check_document_exists, link_document_to_user, 
+    find_document_by_fingerprint, save_ingested_document, get_user_email,
+    CHUNK_TEXT_MAX_CHARS
 )
 from src.services.email_service import send_ingestion_notification
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ingest_executor = None
+_ingest_executor_lock = threading.Lock()
+
+def _get_ingest_executor() -> ThreadPoolExecutor:
+    """Get or create the dedicated ingestion worker pool"""
+    global _ingest_executor
+    if _ingest_executor is None:
+        with _ingest_executor_lock:
+            if _ingest_executor is None:
+                _ingest_executor = ThreadPoolExecutor(
+                    max_workers=config.INGEST_WORKERS,
+                    thread_name_prefix="ingest"
+                )
+                # Once per process, on its own thread so it doesn't hold a job slot
+                threading.Thread(target=_sweep_stale_work_dirs, name="ingest-sweep", daemon=True).start()
+    return _ingest_executor
+
+def _sweep_stale_work_dirs():
+    """Clear work dirs left behind by jobs that died before their cleanup ran"""
+    stale_removed = sweep_stale_temp_dirs(prefix="ingest_")
+    if stale_removed:
+        logger.info(f"Removed {stale_removed} stale ingestion work dirs")
+
+def submit_ingestion_job(job_id: str, user_id: str, sources: List[Dict]):
+    """
+    Queue an ingestion job on the ingestion worker pool.
+    Jobs beyond INGEST_WORKERS wait in the queue instead of taking
+    threads from the pool that serves API requests.
+    """
+    future = _get_ingest_executor().submit(run_ingestion_pipeline, job_id, user_id, sources)
+    future.add_done_callback(lambda f: _log_job_failure(job_id, f))
+
+def _log_job_failure(job_id: str, future: Future):
+    """Surface exceptions that escape the pipeline (e.g. from its finally block)"""
+    if future.cancelled():
+        logger.warning(f"Ingestion job {job_id} was cancelled before it ran")
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"Ingestion job {job_id} crashed: {exc!r}", exc_info=exc)
+
+class _JobProgress:
+    """
+    Coalesce per-source job counter updates into periodic bump_job writes.
+    Progress reaches the DB every JOB_PROGRESS_FLUSH_SOURCES sources or
+    JOB_PROGRESS_FLUSH_SECONDS, whichever comes first; the pipeline's final
+    absolute status update covers anything still pending.
+    """
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.inc = {}
+        self.append = {}
+        self.pending_sources = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, inc: Dict[str, int], append: Dict[str, str] = None):
+        for key, value in inc.items():
+            self.inc[key] = self.inc.get(key, 0) + value
+        for key, value in (append or {}).items():
+            self.append.setdefault(key, []).append(value)
+        self.pending_sources += 1
+
+        if (self.pending_sources >= config.JOB_PROGRESS_FLUSH_SOURCES
+                or time.monotonic() - self.last_flush >= config.JOB_PROGRESS_FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self):
+        if self.pending_sources:
+            bump_job(self.job_id, inc=self.inc, append=self.append)
+        self.inc = {}
+        self.append = {}
+        self.pending_sources = 0
+        self.last_flush = time.monotonic()
+
+def _prefetch_source(source: Dict, source_dir: str) -> Dict[str, Any]:
+    """
+    Network stage for a single URL source: fingerprint probe, then download
+    unless the fingerprint already maps to an ingested document.
+    Runs ahead of processing on the download pool.
+    """
+    source_fingerprint = fetch_source_fingerprint(source['value'])
+    existing_sha256 = find_document_by_fingerprint(source_fingerprint) if source_fingerprint else None
+    if existing_sha256:
+        return {'fingerprint': source_fingerprint, 'existing_sha256': existing_sha256, 'download': None}
+    
+    # No parents: if the job already finished and removed its work dir, fail instead of recreating it
+    os.mkdir(source_dir)
+    return {
+        'fingerprint': source_fingerprint,
+        'existing_sha256': None,
+        'download': download_pdf(source['value'], source_dir)
+    }
 
 def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
     """
@@ -37,48 +139,89 @@ def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
     errors_list = []
     documents_list = []
     total_chunks = 0
+    progress = _JobProgress(job_id)
+
+    # Downloads run ahead of processing so later sources are on disk by the time they're needed
+    download_executor = ThreadPoolExecutor(max_workers=config.DOWNLOAD_CONCURRENCY, thread_name_prefix="download")
 
     try:
-        print(f"Starting pipeline for job {job_id}")
+        logger.info(f"Starting pipeline for job {job_id}")
         ensure_collection()
         
+        # Bounded look-ahead: at most DOWNLOAD_CONCURRENCY sources past the current one are
+        # fetched, and each source's files are removed once the next one starts, so temp disk
+        # use doesn't grow with the size of the job
+        prefetches = [None] * len(sources)
+        next_to_submit = 0
+        previous_source_dir = None
+        
         for idx, source in enumerate(sources):
-            print(f"Processing source {idx+1}/{len(sources)}")
+            while next_to_submit < len(sources) and next_to_submit <= idx + config.DOWNLOAD_CONCURRENCY:
+                if sources[next_to_submit]['type'] == 'url':
+                    prefetches[next_to_submit] = download_executor.submit(
+                        _prefetch_source, sources[next_to_submit],
+                        os.path.join(work_dir, f"source_{next_to_submit}")
+                    )
+                next_to_submit += 1
+            
+            if previous_source_dir:
+                cleanup_directory_async(previous_source_dir)
+            previous_source_dir = os.path.join(work_dir, f"source_{idx}")
+            
+            logger.info(f"Processing source {idx+1}/{len(sources)}")
             processed_count += 1
             
             # 1. Download & 2. Validate
             file_path = None
             original_filename = source.get('filename', 'unknown.pdf')
+            source_dir = work_dir
+            
+            source_fingerprint = None
             
             if source['type'] == 'url':
-                result = download_pdf(source['value'], work_dir)
+                prefetched = prefetches[idx].result()
+                source_fingerprint = prefetched['fingerprint']
+                
+                # The download was skipped if this URL's content is already ingested
+                existing_sha256 = prefetched['existing_sha256']
+                if existing_sha256:
+                    logger.info(f"Document exists (source fingerprint): {existing_sha256}")
+                    link_document_to_user(user_id, existing_sha256)
+                    
+                    success_count += 1
+                    duplicates_count += 1
+                    documents_list.append(existing_sha256)
+                    
+                    progress.add(
+                        inc={'processed': 1, 'successful': 1, 'duplicates': 1},
+                        append={'documents': existing_sha256}
+                    )
+                    continue
+                
+                result = prefetched['download']
                 if not result:
                     failed_count += 1
                     errors_list.append(f"Download failed for {source['value']}")
-                    update_job_status(job_id, {
-                        'processed': processed_count,
-                        'failed': failed_count,
-                        'errors': errors_list
-                    })
+                    progress.add(
+                        inc={'processed': 1, 'failed': 1},
+                        append={'errors': errors_list[-1]}
+                    )
                     continue
-                file_path, original_filename = result
+                file_path, original_filename, sha256 = result
+                source_dir = os.path.dirname(file_path)
             else:
                 failed_count += 1
                 errors_list.append(f"Unsupported source type: {source['type']}")
-                update_job_status(job_id, {
-                    'processed': processed_count,
-                    'failed': failed_count,
-                    'errors': errors_list
-                })
+                progress.add(
+                    inc={'processed': 1, 'failed': 1},
+                    append={'errors': errors_list[-1]}
+                )
                 continue
 
-            # 3. Compute SHA256
-            sha256 = compute_sha256(file_path)
-            
-            # Check DB
+            # 3. SHA256 was computed while downloading; check DB
             existing = check_document_exists(sha256)
             if existing:
-                print(f"Document exists: {sha256}")
+                logger.info(f"Document exists: {sha256}")
                 link_document_to_user(user_id, sha256)
                 
                 success_count += 1
@@ -86,70 +229,75 @@ def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
                 documents_list.append(sha256)
                 
                 # Update counters only, status will be set in finally block
-                update_job_status(job_id, {
-                    'processed': processed_count,
-                    'successful': success_count,
-                    'duplicates': duplicates_count,
-                    'documents': documents_list
-                })
+                progress.add(
+                    inc={'processed': 1, 'successful': 1, 'duplicates': 1},
+                    append={'documents': sha256}
+                )
+                continue
+
+            # Validate once; the page count is reused for the document record
+            total_pages = validate_pdf(file_path)
+            if total_pages is None:
+                failed_count += 1
+                errors_list.append(f"Invalid or corrupted PDF: {original_filename}")
+                progress.add(
+                    inc={'processed': 1, 'failed': 1},
+                    append={'errors': errors_list[-1]}
+                )
                 continue
 
             # 4. Split PDF
-            chunks = split_pdf(file_path, work_dir)
+            chunks = split_pdf(file_path, source_dir)
             
             # Document Metadata
             doc_info = {
                 'sha256': sha256,
                 'original_filename': original_filename,
-                'total_pages': validate_pdf(file_path),
+                'total_pages': total_pages,
                 'source_type': source['type'],
-                'source_value': source.get('value') if source['type'] == 'url' else None
+                'source_value': source.get('value') if source['type'] == 'url' else None,
+                'source_fingerprint': source_fingerprint
             }
-            save_document_metadata(doc_info, user_id)
 
             # 5. Extract Text & 6. Detect Papers
-            full_text_buffer = ""
+            text_parts = []
             extracted_chunks = []
             
-            for chunk in chunks:
-                text = extract_text_from_chunk(chunk['path'], chunk)
+            chunk_texts = extract_texts_from_chunks(chunks)
+            
+            for chunk, text in zip(chunks, chunk_texts):
                 if text:
                     chunk['text_content'] = text
                     extracted_chunks.append(chunk)
                     # Add explicit page markers for the metadata detector
-                    full_text_buffer += f"\n--- PAGE START: {chunk.get('page_start')} END: {chunk.get('page_end')} ---\n"
-                    full_text_buffer += text + "\n\n"
+                    text_parts.append(f"\n--- PAGE START: {chunk.get('page_start')} END: {chunk.get('page_end')} ---\n")
+                    text_parts.append(text + "\n\n")
             
-            # Detect papers with page ranges
-            papers_metadata = detect_exam_papers(full_text_buffer)
-            paper_db_ids = save_papers(sha256, papers_metadata)
+            # Detect papers with page ranges while the chunks are embedded;
+            # embeddings only need the text, papers are joined in afterwards
+            full_text_buffer = "".join(text_parts)
+            with ThreadPoolExecutor(max_workers=1) as stage_executor:
+                papers_future = stage_executor.submit(detect_exam_papers, full_text_buffer)
+                
+                # 8. Generate Embeddings (all chunks of the document in one batched call)
+                vectors = embed_texts([chunk['text_content'] for chunk in extracted_chunks])
+                
+                papers_metadata = papers_future.result()
 
-            # 7. Map text to paper (Filter papers per chunk)
-            
-            # 8. Generate Embeddings & 9. Store Vectors
+            # 7. Map text to paper (Filter papers per chunk) & 9. Store Vectors
             points_to_upsert = []
+            chunk_rows = []
             
-            for chunk in extracted_chunks:
+            paper_ranges = build_paper_ranges(papers_metadata)
+            
+            for chunk, vector in zip(extracted_chunks, vectors):
                 # Filter relevant papers for this chunk
-                chunk_start = chunk.get('page_start', 1)
-                chunk_end = chunk.get('page_end', 1)
-                
-                relevant_papers = []
-                for paper in papers_metadata:
-                    p_start = paper.get('start_page', 1)
-                    p_end = paper.get('end_page', 9999)
-                    
-                    # Check overlap
-                    if max(chunk_start, p_start) <= min(chunk_end, p_end):
-                        relevant_papers.append(paper)
+                relevant_papers = find_overlapping_papers(
+                    chunk.get('page_start', 1), chunk.get('page_end', 1), paper_ranges
+                )
 
-                # Embed
-                embeddings = embed_texts([chunk['text_content']])
-                if not embeddings: continue
-                vector = embeddings[0]
-                
                 # Qdrant Point
-                point_id = str(uuid.uuid4())
+                point_id = chunk_point_id(sha256, chunk['chunk_number'])
                 payload = {
                     "text": chunk['text_content'],
                     "document_sha256": sha256,
@@ -166,26 +314,42 @@ def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
                     "payload": payload
                 })
                 
-                # DB Store
-                save_chunk_metadata(sha256, chunk, point_id, chunk['text_content'], paper_db_ids)
+                chunk_rows.append({
+                    "chunk_number": chunk['chunk_number'],
+                    "page_start": chunk.get('page_start', 0),
+                    "page_end": chunk.get('page_end', 0),
+                    "qdrant_point_id": point_id,
+                    # Truncate once here; Postgres only stores a preview of the chunk
+                    "text_content": chunk['text_content'][:CHUNK_TEXT_MAX_CHARS]
+                })
 
             # Upsert batch
             if points_to_upsert:
                 upsert_vectors(points_to_upsert)
-                total_chunks += len(points_to_upsert)
 
+            # DB Store (document, papers and chunks in one transaction)
+            if save_ingested_document(doc_info, user_id, papers_metadata, chunk_rows) is None:
+                # Rolled back: the document isn't recorded, so it must not count as ingested
+                failed_count += 1
+                errors_list.append(f"Failed to save document metadata: {original_filename}")
+                progress.add(
+                    inc={'processed': 1, 'failed': 1},
+                    append={'errors': errors_list[-1]}
+                )
+                continue
+
+            total_chunks += len(points_to_upsert)
             success_count += 1
             documents_list.append(sha256)
             
             # Update counters only, status will be set in finally block
-            update_job_status(job_id, {
-                "successful": success_count,
-                "processed": processed_count,
-                "documents": documents_list
-            })
+            progress.add(
+                inc={'processed': 1, 'successful': 1},
+                append={'documents': sha256}
+            )
 
     except Exception as e:
-        print(f"Pipeline failed: {e}")
+        logger.error(f"Pipeline failed: {e}")
         errors_list.append(str(e))
         update_job_status(job_id, {
             "status": "failed", 
@@ -217,7 +381,7 @@ def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
             # Nothing processed
             final_status = 'failed'
         
-        # Final status update ensures consistency
+        # Final status update ensures consistency (and covers progress not yet flushed)
         final_update = {
             'processed': processed_count,
             'successful': success_count,
@@ -229,7 +393,11 @@ def run_ingestion_pipeline(job_id: str, user_id: str, sources: List[Dict]):
         }
             
         update_job_status(job_id, final_update)
-        cleanup_directory(work_dir)
+        # Don't wait for in-flight downloads of sources that will never be processed;
+        # the work dir cleanup tolerates files they are still writing
+        download_executor.shutdown(wait=False, cancel_futures=True)
+        # Deleting split chunks is disk-bound; don't hold up the notification for it
+        cleanup_directory_async(work_dir)
         
         # Send email notification
         user_email = get_user_email(user_id)
@@ -1,5 +1,8 @@
 import resend
 from src.config import config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 resend.api_key = config.RESEND_API_KEY
 
@@ -16,7 +19,7 @@ def send_ingestion_notification(user_email: str, status: str, document_count: in
         error_message: Error message if status is failed
     """
     if not config.RESEND_API_KEY or not user_email:
-        print(f"Skipping email notification - RESEND_API_KEY or user_email not configured")
+        logger.warning("Skipping email notification - RESEND_API_KEY or user_email not configured")
         return
     
     try:
@@ -108,9 +111,9 @@ def send_ingestion_notification(user_email: str, status: str, document_count: in
         }
         
         email = resend.Emails.send(params)
-        print(f"Email notification sent to {user_email}: {email}")
+        logger.info(f"Email notification sent to {user_email}: {email}")
         return email
         
     except Exception as e:
-        print(f"Failed to send email notification: {e}")
+        logger.error(f"Failed to send email notification: {e}")
         return None
@@ -1,81 +1,143 @@
 from typing import List
 import hashlib
+import base64
+import struct
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from src.config import config
-from src.clients.gemini_client import get_gemini_client, generate_content_with_retry
-from src.clients.redis_client import cache_get, cache_set
+from src.clients.gemini_client import embed_content, is_invalid_argument_error
+from src.clients.redis_client import cache_get_many, cache_set_many
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EMBEDDING_CACHE_TTL = 2592000  # 30 days
+
+def _embedding_cache_key(model: str, text: str) -> str:
+    # v2: vectors are stored packed (see _pack_embedding), not as JSON float lists
+    return f"embedding:v2:{model}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+INT8_PREFIX = "i8:"
+
+def _pack_embedding(embedding: List[float]) -> str:
+    """
+    Encode a vector for the cache: base64 float32 bytes (~4x smaller than a JSON
+    float list), or with EMBEDDING_CACHE_DTYPE=int8 a per-vector scale plus int8
+    components (another 4x smaller, slightly lossy)
+    """
+    if config.EMBEDDING_CACHE_DTYPE == "int8":
+        scale = max((abs(v) for v in embedding), default=0.0) or 1.0
+        quantized = array('b', (round(v / scale * 127) for v in embedding))
+        return INT8_PREFIX + base64.b64encode(struct.pack('<f', scale) + quantized.tobytes()).decode('ascii')
+    return base64.b64encode(array('f', embedding).tobytes()).decode('ascii')
+
+def _unpack_embedding(packed: str) -> List[float]:
+    """Decode a vector stored by _pack_embedding (either format)"""
+    if packed.startswith(INT8_PREFIX):
+        raw = base64.b64decode(packed[len(INT8_PREFIX):])
+        step = struct.unpack('<f', raw[:4])[0] / 127
+        quantized = array('b')
+        quantized.frombytes(raw[4:])
+        return [q * step for q in quantized]
+    vector = array('f')
+    vector.frombytes(base64.b64decode(packed))
+    return vector.tolist()
+
+def _embed_batch(model: str, batch: List[str]) -> List[List[float]]:
+    """Embed one request-sized batch of texts"""
+    result = embed_content(model=model, contents=batch)
+
+    if not hasattr(result, 'embeddings') or not result.embeddings:
+        raise RuntimeError("No embeddings returned from Gemini API")
+
+    return [e.values for e in result.embeddings]
+
+def _embed_batch_with_fallback(model: str, batch: List[str]) -> List[List[float]]:
+    """
+    Embed a batch in one request; if the API rejects the batch's input, retry
+    its texts one at a time so a single bad input doesn't fail the whole document.
+    Rate-limit/availability errors are already retried with backoff by
+    embed_content and are not split up, which would only multiply the load.
+    """
+    try:
+        embeddings = _embed_batch(model, batch)
+        if len(embeddings) == len(batch):
+            return embeddings
+        logger.warning(f"Batch embedding returned {len(embeddings)} vectors for {len(batch)} texts, retrying individually")
+    except Exception as e:
+        if len(batch) == 1 or not is_invalid_argument_error(e):
+            raise
+        logger.warning(f"Batch embedding of {len(batch)} texts was rejected, retrying individually: {e}")
+
+    return [_embed_batch(model, [text])[0] for text in batch]
 
 def embed_texts(texts: List[str], model: str = None) -> List[List[float]]:
     """
     Generate embeddings for a list of texts using Gemini with caching
     """
     if not texts:
-        return []    
+        return []
     if model is None:
         model = config.GEMINI_EMBEDDING_MODEL
-    
-    # Check cache for each text
-    all_embeddings = []
+
+    # Look up all texts in the cache with a single round-trip
+    cache_keys = [_embedding_cache_key(model, text) for text in texts]
+    all_embeddings = cache_get_many(cache_keys)
+
     uncached_texts = []
-    uncached_indices = []
     text_to_indices = {}  # Map text to all its indices (for deduplication)
-    
-    for idx, text in enumerate(texts):
-        cache_key = f"embedding:{model}:{hashlib.sha256(text.encode()).hexdigest()}"
-        cached_embedding = cache_get(cache_key)
-        
+
+    for idx, (text, cached_embedding) in enumerate(zip(texts, all_embeddings)):
         if cached_embedding is not None:
-            # Validate cached embedding is a list
-            if not isinstance(cached_embedding, list):
-                print(f"Warning: Invalid cached embedding format for text {idx}")
+            try:
+                cached_embedding = _unpack_embedding(cached_embedding)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Invalid cached embedding format for text {idx}: {e}")
                 cached_embedding = None
-        
-        if cached_embedding is not None:
-            all_embeddings.append(cached_embedding)
-        else:
-            all_embeddings.append(None)
-            
+            all_embeddings[idx] = cached_embedding
+
+        if cached_embedding is None:
             # Track this text needs embedding (deduplicate later)
             if text not in text_to_indices:
                 text_to_indices[text] = []
                 uncached_texts.append(text)
             text_to_indices[text].append(idx)
-            uncached_indices.append(idx)
-    
+
+    reused_count = len(texts) - sum(len(indices) for indices in text_to_indices.values())
+
     # Generate embeddings for uncached texts (deduplicated)
     if uncached_texts:
-        client = get_gemini_client()
         try:
-            batch_size = 100
+            batch_size = config.EMBEDDING_BATCH_SIZE
+            batches = [uncached_texts[i:i + batch_size] for i in range(0, len(uncached_texts), batch_size)]
             new_embeddings = []
-            
-            for i in range(0, len(uncached_texts), batch_size):
-                batch = uncached_texts[i:i + batch_size]
-                result = client.models.embed_content(
-                    model=model,
-                    contents=batch,
-                )
-                
-                if not hasattr(result, 'embeddings') or not result.embeddings:
-                    raise RuntimeError("No embeddings returned from Gemini API")
-                
-                new_embeddings.extend([e.values for e in result.embeddings])
-            
+
+            if len(batches) == 1:
+                new_embeddings = _embed_batch_with_fallback(model, batches[0])
+            else:
+                # Overlap request round-trips; map() keeps batch order
+                with ThreadPoolExecutor(max_workers=min(config.GEMINI_CONCURRENCY, len(batches))) as executor:
+                    for batch_embeddings in executor.map(lambda batch: _embed_batch_with_fallback(model, batch), batches):
+                        new_embeddings.extend(batch_embeddings)
+
             # Validate embedding count matches deduplicated text count
             if len(new_embeddings) != len(uncached_texts):
                 raise ValueError(f"Embedding count mismatch: expected {len(uncached_texts)}, got {len(new_embeddings)}")
-            
+
             # Cache new embeddings and insert into results for ALL occurrences of each text
-            for text_idx, (text, embedding) in enumerate(zip(uncached_texts, new_embeddings)):
-                # Cache the embedding
-                cache_key = f"embedding:{model}:{hashlib.sha256(text.encode()).hexdigest()}"
-                cache_set(cache_key, embedding, ttl=2592000)  # 30 days
-                
+            new_cache_entries = {}
+            for text, embedding in zip(uncached_texts, new_embeddings):
+                new_cache_entries[_embedding_cache_key(model, text)] = _pack_embedding(embedding)
+
                 # Update all positions where this text appears
                 for original_idx in text_to_indices[text]:
                     all_embeddings[original_idx] = embedding
-                
+
+            cache_set_many(new_cache_entries, ttl=EMBEDDING_CACHE_TTL)
+
         except Exception as e:
-            print(f"Embedding failed: {e}")
+            logger.error(f"Embedding failed: {e}")
             raise e
-    
-    return all_embeddings
\ No newline at end of file
+
+    logger.info(f"Embeddings: reused {reused_count} cached / embedded {len(uncached_texts)} new")
+    return all_embeddings
@@ -1,20 +1,22 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import os
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 from src.config import config
 from src.clients.gemini_client import get_gemini_client, generate_content_with_retry
+from src.clients.redis_client import cache_get, cache_set
+from src.utils.hashing import compute_sha256
 from google.genai import types
+from src.utils.logger import get_logger
 
-def extract_text_from_chunk(file_path: str, chunk_info: Dict[str, Any]) -> str:
-    """
-    Extract structured text from a PDF chunk using Gemini.
-    """
-    try:
-        with open(file_path, "rb") as f:
-            pdf_data = f.read()
+logger = get_logger(__name__)
 
-        prompt = """Extract ALL text from this PDF exactly as it appears. 
+EXTRACTION_CACHE_TTL = 2592000  # 30 days
+EXTRACTION_PROMPT_VERSION = "1"  # Bump when EXTRACTION_PROMPT changes to invalidate cached extractions
+INLINE_PDF_MAX_BYTES = 4 * 1024 * 1024  # Larger chunks go through the Files API so retries don't resend them
+
+EXTRACTION_PROMPT = """Extract ALL text from this PDF exactly as it appears. 
 
 Rules:
 - Output ONLY the actual text content from the PDF
@@ -25,15 +27,62 @@ Rules:
 - Just extract the raw text content
 
 Extract the text:"""
-        response = generate_content_with_retry(
-            model=config.GEMINI_GENERATION_MODEL,
-            contents=[
-                types.Part.from_bytes(data=pdf_data, mime_type='application/pdf'),
-                prompt
-            ]
+
+def extract_text_from_chunk(file_path: str, chunk_info: Dict[str, Any]) -> str:
+    """
+    Extract structured text from a PDF chunk using Gemini.
+    """
+    try:
+        # Identical pages (cover sheets, instructions, re-uploads) reuse earlier extractions.
+        # Hash from the file so cache hits and uploaded chunks never load the PDF into memory.
+        cache_key = (
+            f"extract:v{EXTRACTION_PROMPT_VERSION}:{config.GEMINI_GENERATION_MODEL}:"
+            f"{compute_sha256(file_path)}"
         )
-        return response.text if response and response.text else ""
+        cached_text = cache_get(cache_key)
+        if cached_text:
+            return cached_text
+
+        uploaded = None
+        if os.path.getsize(file_path) > INLINE_PDF_MAX_BYTES:
+            # Upload once; generate calls (and their retries) only carry the file URI
+            uploaded = get_gemini_client().files.upload(
+                file=file_path,
+                config=types.UploadFileConfig(mime_type='application/pdf')
+            )
+            pdf_part = types.Part.from_uri(file_uri=uploaded.uri, mime_type='application/pdf')
+        else:
+            with open(file_path, "rb") as f:
+                pdf_part = types.Part.from_bytes(data=f.read(), mime_type='application/pdf')
+
+        try:
+            response = generate_content_with_retry(
+                model=config.GEMINI_GENERATION_MODEL,
+                contents=[pdf_part, EXTRACTION_PROMPT]
+            )
+        finally:
+            if uploaded is not None:
+                try:
+                    get_gemini_client().files.delete(name=uploaded.name)
+                except Exception as e:
+                    logger.error(f"Failed to delete uploaded file {uploaded.name}: {e}")
+
+        text = response.text if response and response.text else ""
+        if text:
+            cache_set(cache_key, text, ttl=EXTRACTION_CACHE_TTL)
+        return text
         
     except Exception as e:
-        print(f"Extraction failed for {file_path}: {e}")
+        logger.error(f"Extraction failed for {file_path}: {e}")
         return ""
+
+def extract_texts_from_chunks(chunks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Extract text from all chunks of a document concurrently.
+    Returns texts in the same order as chunks.
+    """
+    if not chunks:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(config.GEMINI_CONCURRENCY, len(chunks))) as executor:
+        return list(executor.map(lambda chunk: extract_text_from_chunk(chunk['path'], chunk), chunks))
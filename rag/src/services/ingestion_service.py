@@ -1,23 +1,104 @@
+import io
+import csv
 import uuid
 import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import re
+import threading
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 from typing import Dict, Optional, List, Any
 from datetime import datetime
 from src.config import config
-from src.clients.redis_client import cache_get, cache_set, invalidate_pattern
+from src.clients.redis_client import cache_get, cache_set, cache_delete, invalidate_pattern
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Job status is polled while a job runs. Writers store the fresh row in Redis after each
+# update; readers only fill an empty key (NX) so they don't overwrite a newer cached row.
+# If a writer's cache set and delete both fail, or a poll's NX fill lands after the delete,
+# a stale row can still be cached, so the TTL stays short to bound how long it is served.
+JOB_STATUS_CACHE_TTL = 5
+
+DOC_EXISTS_CACHE_TTL = 86400  # 1 day
+
+# Chunk batches at least this large are written with COPY instead of a multi-row INSERT
+CHUNK_COPY_THRESHOLD = 100
+CHUNK_TEXT_MAX_CHARS = 5000  # document_chunks keeps a preview; full text lives in Qdrant
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements were prepared on its session"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+def _get_pool() -> Optional[ThreadedConnectionPool]:
+    """Get or create singleton PostgreSQL connection pool"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    minconn=config.PG_POOL_MIN,
+                    maxconn=config.PG_POOL_MAX,
+                    dsn=config.DATABASE_URL,
+                    connection_factory=_PooledConnection
+                )
+                # ThreadedConnectionPool raises instead of waiting when exhausted,
+                # so callers block on this semaphore for a free connection
+                _pool_slots = threading.BoundedSemaphore(config.PG_POOL_MAX)
+    return _pool
 
 def get_db_connection():
-    """Get PostgreSQL connection"""
+    """Get PostgreSQL connection from the pool; release it with release_db_connection"""
     if not config.DATABASE_URL:
-        print("DATABASE_URL not set, DB features disabled")
+        logger.warning("DATABASE_URL not set, DB features disabled")
         return None
     try:
-        return psycopg2.connect(config.DATABASE_URL, cursor_factory=RealDictCursor)
+        pool = _get_pool()
+        # Bounded wait: a leaked connection must not hang every request and job forever
+        if not _pool_slots.acquire(timeout=config.PG_POOL_TIMEOUT):
+            logger.error(f"DB Connection failed: no free pooled connection after {config.PG_POOL_TIMEOUT}s")
+            return None
+        try:
+            return pool.getconn()
+        except Exception:
+            _pool_slots.release()
+            raise
     except Exception as e:
-        print(f"DB Connection failed: {e}")
+        logger.error(f"DB Connection failed: {e}")
         return None
 
+def release_db_connection(conn):
+    """Return a connection to the pool (open transactions are rolled back)"""
+    try:
+        _pool.putconn(conn)
+    except Exception as e:
+        logger.error(f"DB Connection release failed: {e}")
+    finally:
+        _pool_slots.release()
+
+def _execute_prepared(cur, name: str, query: str, params: tuple):
+    """
+    Execute a hot query through a server-side prepared statement, preparing it
+    once per pooled connection so PostgreSQL parses and plans it only once.
+    """
+    if not config.PG_PREPARED_STATEMENTS:
+        cur.execute(query, params)
+        return
+    
+    conn = cur.connection
+    if name not in conn.prepared_statements:
+        placeholders = iter(range(1, len(params) + 1))
+        cur.execute(f"PREPARE {name} AS " + re.sub(r"%s", lambda _: f"${next(placeholders)}", query))
+        conn.prepared_statements.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
 def get_user_email(user_id: str) -> Optional[str]:
     """Get user email from database by user_id"""
     conn = get_db_connection()
@@ -26,17 +107,34 @@ def get_user_email(user_id: str) -> Optional[str]:
     
     try:
         cur = conn.cursor()
-        cur.execute(
+        _execute_prepared(
+            cur, "get_user_email",
             "SELECT email FROM users WHERE id = %s",
             (user_id,)
         )
         result = cur.fetchone()
-        return result['email'] if result else None
+        return result[0] if result else None
     except Exception as e:
-        print(f"Failed to get user email: {e}")
+        logger.error(f"Failed to get user email: {e}")
         return None
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def _job_row_to_dict(cur, row) -> Dict:
+    """Convert an ingestion_jobs row to the JSON-safe dict served by the status API"""
+    columns = [desc[0] for desc in cur.description]
+    job_data = dict(zip(columns, row))
+    job_data['created_at'] = job_data['created_at'].isoformat() if job_data.get('created_at') else None
+    job_data['updated_at'] = job_data['updated_at'].isoformat() if job_data.get('updated_at') else None
+    job_data['job_id'] = str(job_data['job_id'])
+    return job_data
+
+def _cache_job_row(job_id: str, cur):
+    """Write the row returned by an UPDATE ... RETURNING * through to the status cache"""
+    row = cur.fetchone()
+    cache_key = f"job_status:{job_id}"
+    if not row or not cache_set(cache_key, _job_row_to_dict(cur, row), ttl=JOB_STATUS_CACHE_TTL):
+        cache_delete(cache_key)
 
 def create_job(user_id: str, total_sources: int) -> str:
     """Create a new ingestion job in PostgreSQL"""
@@ -58,9 +156,9 @@ def create_job(user_id: str, total_sources: int) -> str:
         )
         conn.commit()
     except Exception as e:
-        print(f"Failed to create job in DB: {e}")
+        logger.error(f"Failed to create job in DB: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
     
     return job_id
 
@@ -86,36 +184,88 @@ def update_job_status(job_id: str, updates: Dict):
         
         if set_clauses:
             values.append(job_id)
-            query = f"UPDATE ingestion_jobs SET {', '.join(set_clauses)} WHERE job_id = %s"
+            query = f"UPDATE ingestion_jobs SET {', '.join(set_clauses)} WHERE job_id = %s RETURNING *"
             cur.execute(query, values)
             conn.commit()
+            _cache_job_row(job_id, cur)
     except Exception as e:
-        print(f"Failed to update job status: {e}")
+        logger.error(f"Failed to update job status: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+JOB_COUNTER_COLUMNS = {'processed', 'successful', 'failed', 'duplicates'}
+JOB_LIST_COLUMNS = {'errors', 'documents'}
+
+def bump_job(job_id: str, inc: Dict[str, int] = None, append: Dict[str, Any] = None):
+    """
+    Increment job counters and append to job lists in place.
+    Only the deltas are sent, so per-source updates stay constant-size
+    instead of rewriting the full errors/documents arrays each time.
+    append values may be a single item or a list of items.
+    """
+    set_clauses = []
+    values = []
+    
+    for key, value in (inc or {}).items():
+        if key not in JOB_COUNTER_COLUMNS:
+            raise ValueError(f"Unknown job counter: {key}")
+        set_clauses.append(f"{key} = {key} + %s")
+        values.append(value)
+    
+    for key, value in (append or {}).items():
+        if key not in JOB_LIST_COLUMNS:
+            raise ValueError(f"Unknown job list: {key}")
+        set_clauses.append(f"{key} = {key} || %s::jsonb")
+        values.append(json.dumps(value if isinstance(value, list) else [value]))
+    
+    if not set_clauses:
+        return
+    
+    conn = get_db_connection()
+    if not conn:
+        return
+    
+    try:
+        cur = conn.cursor()
+        values.append(job_id)
+        cur.execute(
+            f"UPDATE ingestion_jobs SET {', '.join(set_clauses)} WHERE job_id = %s RETURNING *",
+            values
+        )
+        conn.commit()
+        _cache_job_row(job_id, cur)
+    except Exception as e:
+        logger.error(f"Failed to bump job status: {e}")
+    finally:
+        release_db_connection(conn)
 
 def get_job_status(job_id: str) -> Optional[Dict]:
-    """Get job status from PostgreSQL"""
+    """Get job status (Redis first, then PostgreSQL)"""
+    cache_key = f"job_status:{job_id}"
+    cached_status = cache_get(cache_key)
+    if cached_status is not None:
+        return cached_status
+    
     conn = get_db_connection()
     if not conn:
         return None
     
     try:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM ingestion_jobs WHERE job_id = %s", (job_id,))
+        _execute_prepared(cur, "get_job_status", "SELECT * FROM ingestion_jobs WHERE job_id = %s", (job_id,))
         result = cur.fetchone()
         
         if result:
-            job_data = dict(result)
-            job_data['created_at'] = job_data['created_at'].isoformat() if job_data.get('created_at') else None
-            job_data['updated_at'] = job_data['updated_at'].isoformat() if job_data.get('updated_at') else None
+            job_data = _job_row_to_dict(cur, result)
+            # NX: never overwrite a fresher row written by update_job_status/bump_job
+            cache_set(cache_key, job_data, ttl=JOB_STATUS_CACHE_TTL, nx=True)
             return job_data
         return None
     except Exception as e:
-        print(f"Failed to get job status: {e}")
+        logger.error(f"Failed to get job status: {e}")
         return None
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_system_stats() -> Dict[str, Any]:
     """Get system stats from PostgreSQL"""
@@ -128,38 +278,70 @@ def get_system_stats() -> Dict[str, Any]:
         
         # Get total unique documents
         cur.execute("SELECT COUNT(*) as count FROM documents")
-        doc_count = cur.fetchone()['count']
+        doc_count = cur.fetchone()[0]
         
         # Get total chunks
         cur.execute("SELECT COUNT(*) as count FROM document_chunks")
-        chunk_count = cur.fetchone()['count']
+        chunk_count = cur.fetchone()[0]
         
         return {
             "unique_documents": doc_count,
             "total_chunks": chunk_count
         }
     except Exception as e:
-        print(f"Failed to get stats: {e}")
+        logger.error(f"Failed to get stats: {e}")
         return {"unique_documents": 0, "total_chunks": 0}
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 
-def check_document_exists(sha256_hash: str) -> Optional[Dict]:
-    """Check if document already exists in database"""
+def check_document_exists(sha256_hash: str) -> Optional[str]:
+    """Check if document already exists in database, returning its id"""
+    # Only positive results are cached: a miss may become a hit as soon as
+    # another job saves the document, but a saved document never disappears
+    cache_key = f"doc_exists:{sha256_hash}"
+    cached_id = cache_get(cache_key)
+    if cached_id is not None:
+        return cached_id
+    
+    conn = get_db_connection()
+    if not conn: return None
+    
+    try:
+        cur = conn.cursor()
+        _execute_prepared(cur, "check_document_exists", "SELECT id FROM documents WHERE sha256_hash = %s", (sha256_hash,))
+        result = cur.fetchone()
+        if not result:
+            return None
+        
+        doc_id = str(result[0])
+        cache_set(cache_key, doc_id, ttl=DOC_EXISTS_CACHE_TTL)
+        return doc_id
+    except Exception as e:
+        logger.error(f"Database check error: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+def find_document_by_fingerprint(source_fingerprint: str) -> Optional[str]:
+    """Find an existing document's SHA256 by its source URL fingerprint"""
     conn = get_db_connection()
     if not conn: return None
     
     try:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM documents WHERE sha256_hash = %s", (sha256_hash,))
+        _execute_prepared(
+            cur, "find_document_by_fingerprint",
+            "SELECT sha256_hash FROM documents WHERE source_fingerprint = %s AND status = 'completed' LIMIT 1",
+            (source_fingerprint,)
+        )
         result = cur.fetchone()
-        return dict(result) if result else None
+        return result[0] if result else None
     except Exception as e:
-        print(f"Database check error: {e}")
+        logger.error(f"Database fingerprint check error: {e}")
         return None
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def link_document_to_user(user_id: str, sha256_hash: str):
     """Link existing document to user"""
@@ -168,7 +350,8 @@ def link_document_to_user(user_id: str, sha256_hash: str):
 
     try:
         cur = conn.cursor()
-        cur.execute(
+        _execute_prepared(
+            cur, "link_document_to_user",
             """
             INSERT INTO user_documents (user_id, document_sha256)
             VALUES (%s, %s)
@@ -183,168 +366,232 @@ def link_document_to_user(user_id: str, sha256_hash: str):
         invalidate_pattern(cache_key)
         invalidate_pattern(f"query:*")  # Invalidate all query caches since document set changed
         
-        print(f"Linked document {sha256_hash[:8]}... to user {user_id}")
+        logger.info(f"Linked document {sha256_hash[:8]}... to user {user_id}")
     except Exception as e:
-        print(f"Database link error: {e}")
+        logger.error(f"Database link error: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def save_document_metadata(doc_info: Dict, user_id: str) -> Optional[str]:
-    """Save document metadata to PostgreSQL"""
-    conn = get_db_connection()
-    if not conn: return None
+def _save_document(cur, doc_info: Dict, user_id: str) -> Optional[str]:
+    """Insert document metadata and link it to the user"""
+    cur.execute(
+        """
+        INSERT INTO documents (sha256_hash, original_filename, total_pages, upload_source, source_url, source_fingerprint, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (sha256_hash) 
+        DO UPDATE SET status = EXCLUDED.status,
+            source_fingerprint = COALESCE(EXCLUDED.source_fingerprint, documents.source_fingerprint)
+        RETURNING id
+        """,
+        (
+            doc_info['sha256'],
+            doc_info['original_filename'],
+            doc_info['total_pages'],
+            doc_info.get('source_type', 'unknown'),
+            doc_info.get('source_value'),
+            doc_info.get('source_fingerprint'),
+            'completed'
+        )
+    )
+    result = cur.fetchone()
+    doc_id = str(result[0]) if result else None
+    
+    cur.execute(
+        """
+        INSERT INTO user_documents (user_id, document_sha256)
+        VALUES (%s, %s)
+        ON CONFLICT (user_id, document_sha256) DO NOTHING
+        """,
+        (user_id, doc_info['sha256'])
+    )
+    return doc_id
 
-    try:
-        cur = conn.cursor()
-        print(f"Saving metadata for SHA: {doc_info['sha256']}")
+def _save_papers(cur, doc_sha256: str, paper_list: List[Dict]) -> List[str]:
+    """
+    Insert paper metadata, reusing existing papers with the same
+    (subject, year, exam_type), and return IDs in input order.
+    One lookup and one multi-row INSERT regardless of paper count.
+    """
+    if not paper_list:
+        return []
 
-        cur.execute(
-            """
-            INSERT INTO documents (sha256_hash, original_filename, total_pages, upload_source, source_url, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (sha256_hash) 
-            DO UPDATE SET status = EXCLUDED.status
-            RETURNING id
-            """,
-            (
-                doc_info['sha256'],
-                doc_info['original_filename'],
-                doc_info['total_pages'],
-                doc_info.get('source_type', 'unknown'),
-                doc_info.get('source_value'),
-                'completed'
-            )
+    keys = [
+        (
+            paper.get('subject'),
+            str(paper.get('year')) if paper.get('year') is not None else None,
+            paper.get('exam_type')
         )
-        result = cur.fetchone()
-        chunk_db_id = result['id'] if result else None
-        
-        cur.execute(
+        for paper in paper_list
+    ]
+    # NULLs never compare equal in SQL, so only complete keys can match an existing paper
+    lookup_keys = list({key for key in keys if None not in key})
+
+    existing_ids = {}
+    if lookup_keys:
+        results = execute_values(
+            cur,
             """
-            INSERT INTO user_documents (user_id, document_sha256)
-            VALUES (%s, %s)
-            ON CONFLICT (user_id, document_sha256) DO NOTHING
+            SELECT p.id, p.subject, p.year, p.exam_type
+            FROM papers p
+            JOIN (VALUES %s) AS k(subject, year, exam_type)
+              ON p.subject = k.subject AND p.year = k.year AND p.exam_type = k.exam_type
             """,
-            (user_id, doc_info['sha256'])
+            lookup_keys,
+            fetch=True
         )
-        conn.commit()
-        
-        # Invalidate user's document cache and query cache
-        cache_key = f"user_docs:{user_id}"
-        invalidate_pattern(cache_key)
-        invalidate_pattern(f"query:*")  # Invalidate all query caches since document set changed
-        
-        return chunk_db_id
-    except Exception as e:
-        print(f"Database save error: {e}")
-        return None
-    finally:
-        conn.close()
+        for p_id, subject, year, exam_type in results:
+            existing_ids.setdefault((subject, year, exam_type), p_id)
 
-def save_papers(doc_sha256: str, paper_list: List[Dict]) -> List[str]:
-    """Save paper metadata and return IDs"""
-    conn = get_db_connection()
-    if not conn: return []
+    insert_rows = []
+    insert_keys = []
+    for paper, key in zip(paper_list, keys):
+        if key in existing_ids or (None not in key and key in insert_keys):
+            continue
+        insert_keys.append(key)
+        insert_rows.append((
+            doc_sha256,
+            key[0],
+            key[1],
+            paper.get('semester'),
+            paper.get('paper_code'),
+            key[2],
+            paper.get('difficulty'),
+            json.dumps(paper.get('topics', [])),
+            paper.get('start_page'),
+            paper.get('end_page')
+        ))
 
-    paper_ids = []
-    try:
-        cur = conn.cursor()
-        for paper in paper_list:
-            year_val = str(paper.get('year')) if paper.get('year') is not None else None
-            
-            cur.execute(
+    inserted_ids = []
+    if insert_rows:
+        inserted_ids = [
+            row[0] for row in execute_values(
+                cur,
                 """
-                SELECT id FROM papers 
-                WHERE subject = %s AND year = %s AND exam_type = %s
+                INSERT INTO papers (document_sha256, subject, year, semester, paper_code, exam_type, difficulty, topics, start_page, end_page)
+                VALUES %s
+                RETURNING id
                 """,
-                (paper.get('subject'), year_val, paper.get('exam_type'))
+                insert_rows,
+                fetch=True
             )
-            res = cur.fetchone()
-            
-            p_id = None
-            if res:
-                p_id = res['id']
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO papers (document_sha256, subject, year, semester, paper_code, exam_type, difficulty, topics, start_page, end_page)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (
-                        doc_sha256,
-                        paper.get('subject'), 
-                        year_val, 
-                        paper.get('semester'),
-                        paper.get('paper_code'), 
-                        paper.get('exam_type'),
-                        paper.get('difficulty'),
-                        json.dumps(paper.get('topics', [])),
-                        paper.get('start_page'),
-                        paper.get('end_page')
-                    )
-                )
-                res_insert = cur.fetchone()
-                if res_insert:
-                  p_id = res_insert['id']
+        ]
 
-            if p_id:
-                paper_ids.append(p_id)
+    # RETURNING yields ids in VALUES order; papers with incomplete keys each get their own row
+    paper_ids = []
+    inserted = iter(inserted_ids)
+    for key in keys:
+        if key in existing_ids:
+            paper_ids.append(existing_ids[key])
+        elif None in key:
+            paper_ids.append(next(inserted))
+        else:
+            p_id = next(inserted)
+            existing_ids[key] = p_id
+            paper_ids.append(p_id)
 
-        conn.commit()
-        return paper_ids
-    except Exception as e:
-        print(f"Paper save error: {e}")
-        return []
-    finally:
-        conn.close()
+    return paper_ids
 
-def save_chunk_metadata(doc_sha256: str, chunk_info: Dict, qdrant_id: str, text_content: str, paper_ids: List[str]):
-    """Save chunk metadata and link papers"""
-    conn = get_db_connection()
-    if not conn: return
+def _save_chunks(cur, doc_sha256: str, chunk_rows: List[Dict]):
+    """
+    Insert metadata for all chunks of a document in one batch.
+    Small batches use a single multi-row INSERT; large batches are streamed
+    into a temp table with COPY and merged into document_chunks so the
+    ON CONFLICT semantics are preserved.
+    """
+    if not chunk_rows:
+        return
 
-    try:
-        cur = conn.cursor()
-        
-        cur.execute(
+    # text_content arrives already truncated to CHUNK_TEXT_MAX_CHARS by the pipeline
+    rows = [
+        (
+            doc_sha256,
+            row['chunk_number'],
+            row.get('page_start', 0),
+            row.get('page_end', 0),
+            row['qdrant_point_id'],
+            row.get('text_content') or ""
+        )
+        for row in chunk_rows
+    ]
+
+    if len(rows) < CHUNK_COPY_THRESHOLD:
+        execute_values(
+            cur,
             """
             INSERT INTO document_chunks 
             (document_sha256, chunk_number, page_range_start, page_range_end, qdrant_point_id, text_content)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (document_sha256, chunk_number) 
-            DO UPDATE SET qdrant_point_id = EXCLUDED.qdrant_point_id 
-            RETURNING id
+            DO UPDATE SET qdrant_point_id = EXCLUDED.qdrant_point_id
             """,
-            (
-                doc_sha256,
-                chunk_info['chunk_number'],
-                chunk_info.get('page_start', 0),
-                chunk_info.get('page_end', 0),
-                qdrant_id,
-                text_content[:5000] if text_content else ""
-            )
+            rows,
+            page_size=200
         )
+    else:
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        buffer.seek(0)
         
-        result = cur.fetchone()
-        chunk_db_id = result['id'] if result else None
-        
-        if not chunk_db_id:
-             cur.execute("SELECT id FROM document_chunks WHERE document_sha256 = %s AND chunk_number = %s", 
-                        (doc_sha256, chunk_info['chunk_number']))
-             res = cur.fetchone()
-             chunk_db_id = res['id'] if res else None
-
-        if chunk_db_id:
-            # Note: Previously we linked chunk_papers here. 
-            # With the new design, paper metadata is stored in Qdrant payload directly.
-            # We skip SQL relations for simpler RAG architecture.
-            pass
+        cur.execute(
+            """
+            CREATE TEMP TABLE tmp_document_chunks (
+                document_sha256 TEXT, chunk_number INTEGER, page_range_start INTEGER,
+                page_range_end INTEGER, qdrant_point_id BIGINT, text_content TEXT
+            ) ON COMMIT DROP
+            """
+        )
+        cur.copy_expert(
+            """
+            COPY tmp_document_chunks 
+            (document_sha256, chunk_number, page_range_start, page_range_end, qdrant_point_id, text_content)
+            FROM STDIN WITH (FORMAT csv)
+            """,
+            buffer
+        )
+        cur.execute(
+            """
+            INSERT INTO document_chunks 
+            (document_sha256, chunk_number, page_range_start, page_range_end, qdrant_point_id, text_content)
+            SELECT document_sha256, chunk_number, page_range_start, page_range_end, qdrant_point_id, text_content
+            FROM tmp_document_chunks
+            ON CONFLICT (document_sha256, chunk_number) 
+            DO UPDATE SET qdrant_point_id = EXCLUDED.qdrant_point_id
+            """
+        )
 
+def save_ingested_document(doc_info: Dict, user_id: str, paper_list: List[Dict], chunk_rows: List[Dict]) -> Optional[str]:
+    """
+    Save a fully ingested document (document row, user link, papers and chunks)
+    in a single transaction, so a failure never leaves a half-saved document.
+    Returns the document id, or None if nothing was saved.
+    """
+    conn = get_db_connection()
+    if not conn: return None
+
+    try:
+        cur = conn.cursor()
+        logger.info(f"Saving metadata for SHA: {doc_info['sha256']}")
+        
+        doc_id = _save_document(cur, doc_info, user_id)
+        _save_papers(cur, doc_info['sha256'], paper_list)
+        _save_chunks(cur, doc_info['sha256'], chunk_rows)
         conn.commit()
+        
+        if doc_id:
+            cache_set(f"doc_exists:{doc_info['sha256']}", doc_id, ttl=DOC_EXISTS_CACHE_TTL)
+        
+        # Invalidate user's document cache and query cache
+        cache_key = f"user_docs:{user_id}"
+        invalidate_pattern(cache_key)
+        invalidate_pattern(f"query:*")  # Invalidate all query caches since document set changed
+        
+        return doc_id
     except Exception as e:
-        print(f"Chunk metadata save error: {e}")
+        conn.rollback()
+        logger.error(f"Database save error: {e}")
+        return None
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_user_documents(user_id: str) -> List[str]:
     """
@@ -362,7 +609,8 @@ def get_user_documents(user_id: str) -> List[str]:
     
     try:
         cur = conn.cursor()
-        cur.execute(
+        _execute_prepared(
+            cur, "get_user_documents",
             """
             SELECT DISTINCT document_sha256 
             FROM user_documents 
@@ -371,14 +619,14 @@ def get_user_documents(user_id: str) -> List[str]:
             (user_id,)
         )
         results = cur.fetchall()
-        doc_list = [row['document_sha256'] for row in results]
+        doc_list = [row[0] for row in results]
         
         # Cache for 5 minutes
         cache_set(cache_key, doc_list, ttl=300)
         
         return doc_list
     except Exception as e:
-        print(f"Error fetching user documents: {e}")
+        logger.error(f"Error fetching user documents: {e}")
         return []
     finally:
-        conn.close()
+        release_db_connection(conn)
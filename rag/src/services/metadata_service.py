@@ -1,9 +1,52 @@
 from typing import List, Dict, Any
 import json
+import hashlib
 import re
 from src.config import config
 from src.clients.gemini_client import get_gemini_client, generate_content_with_retry
+from src.clients.redis_client import cache_get, cache_set
+from src.models.paper import DetectedPaper
 from google.genai import types
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PAPER_DETECTION_CACHE_TTL = 2592000  # 30 days
+PAPER_DETECTION_PROMPT_VERSION = "2"  # Bump when PAPER_DETECTION_PROMPT changes to invalidate cached results
+CHARS_PER_TOKEN = 4  # Conservative estimate for English/LaTeX text
+PAGE_MARKER = "\n--- PAGE START:"
+
+PAPER_DETECTION_PROMPT = """
+Analyze the following text which contains one or more exam papers.
+The text includes page markers like "--- PAGE START: X END: Y ---".
+
+Identify distinct exam papers and extract metadata for each, including their page range.
+
+Return a valid JSON array of objects with these fields:
+- subject: Subject name (e.g. Physics, Mathematics)
+- year: Year (integer, e.g. 2023)
+- semester: Semester (e.g. "Sem I", "Autumn")
+- paper_code: Course code if available (e.g. "PHYS101")
+- exam_type: Type (e.g. "Mid-Sem", "End-Sem", "Sessional")
+- start_page: The starting page number of this paper (integer)
+- end_page: The ending page number of this paper (integer)
+- topics: List of topics covered
+- difficulty: Estimated difficulty (Easy/Medium/Hard)
+
+If multiple papers are present, list them all. Ensure pages are accurate based on markers.
+"""
+
+def _truncate_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    Trim text to roughly max_tokens, cutting at the last page marker that fits
+    so the detector never sees half a page.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    
+    cut = text.rfind(PAGE_MARKER, 0, max_chars)
+    return text[:cut] if cut > 0 else text[:max_chars]
 
 def detect_exam_papers(text_content: str) -> List[Dict[str, Any]]:
     """
@@ -12,46 +55,42 @@ def detect_exam_papers(text_content: str) -> List[Dict[str, Any]]:
     if not text_content or len(text_content) < 50:
         return []
 
-    prompt = """
-    Analyze the following text which contains one or more exam papers.
-    The text includes page markers like "--- PAGE START: X END: Y ---".
-    
-    Identify distinct exam papers and extract metadata for each, including their page range.
-    
-    Return a valid JSON array of objects with these fields:
-    - subject: Subject name (e.g. Physics, Mathematics)
-    - year: Year (integer, e.g. 2023)
-    - semester: Semester (e.g. "Sem I", "Autumn")
-    - paper_code: Course code if available (e.g. "PHYS101")
-    - exam_type: Type (e.g. "Mid-Sem", "End-Sem", "Sessional")
-    - start_page: The starting page number of this paper (integer)
-    - end_page: The ending page number of this paper (integer)
-    - topics: List of topics covered
-    - difficulty: Estimated difficulty (Easy/Medium/Hard)
-    
-    If multiple papers are present, list them all. Ensure pages are accurate based on markers.
-    """
-    
+    detection_text = _truncate_to_token_budget(text_content, config.PAPER_DETECTION_MAX_TOKENS)
+    if len(detection_text) < len(text_content):
+        logger.warning(f"Paper detection input truncated to {len(detection_text)}/{len(text_content)} chars")
+    cache_key = (
+        f"papers:v{PAPER_DETECTION_PROMPT_VERSION}:{config.GEMINI_GENERATION_MODEL}:"
+        f"{hashlib.sha256(detection_text.encode()).hexdigest()}"
+    )
+    cached_papers = cache_get(cache_key)
+    if cached_papers is not None:
+        return cached_papers
+
     try:
         response = generate_content_with_retry(
             model=config.GEMINI_GENERATION_MODEL,
-            contents=[prompt, text_content[:50000]],
-            config=types.GenerateContentConfig(response_mime_type="application/json")
+            contents=[PAPER_DETECTION_PROMPT, detection_text],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=list[DetectedPaper]
+            )
         )
         
-        try:
-             json_str = response.text
-             if "```json" in json_str:
-                 json_str = json_str.split("```json")[1].split("```")[0]
-             elif "```" in json_str:
-                 json_str = json_str.split("```")[1].split("```")[0]
-                 
-             return json.loads(json_str)
-        except json.JSONDecodeError as e:
-             print(f"Failed to parse JSON for metadata: {e}")
-             print(f"Gemini response (first 500 chars): {response.text[:500]}")
-             return []
+        # Schema-constrained output is parsed by the SDK; fall back to the raw JSON text
+        if response.parsed is not None:
+            papers = [paper.model_dump() for paper in response.parsed]
+        else:
+            try:
+                papers = json.loads(response.text)
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.error(f"Failed to parse JSON for metadata: {e}")
+                logger.info(f"Gemini response (first 500 chars): {(response.text or '')[:500]}")
+                return []
+        
+        if papers:
+            cache_set(cache_key, papers, ttl=PAPER_DETECTION_CACHE_TTL)
+        return papers
 
     except Exception as e:
-        print(f"Metadata detection failed: {e}")
+        logger.error(f"Metadata detection failed: {e}")
         return []
@@ -1,31 +1,61 @@
 from typing import List, Dict, Any, Optional
-from qdrant_client.models import VectorParams, Distance, PointStruct, Filter, FieldCondition, MatchAny
+from qdrant_client.models import (
+    VectorParams, Distance, PointStruct, Filter, FieldCondition, MatchAny,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType
+)
 from src.clients.qdrant_client import get_qdrant_client
 from src.config import config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+UPSERT_BATCH_SIZE = 64  # Points per upsert request
+
+# int8 scalar quantization keeps a 4x smaller copy of the vectors in RAM for search;
+# the original float32 vectors stay on disk for rescoring
+QUANTIZATION_CONFIG = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+
+# Collections already verified to exist in this process
+_ready_collections = set()
 
 def ensure_collection(collection_name: str = None, vector_size: int = 3072):
     if collection_name is None:
         collection_name = config.COLLECTION_NAME
+    if collection_name in _ready_collections:
+        return
     client = get_qdrant_client()
     try:
         if not client.collection_exists(collection_name):
              client.create_collection(
                 collection_name=collection_name,
                 vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+                quantization_config=QUANTIZATION_CONFIG,
+            )
+             logger.info(f"Created collection {collection_name}")
+        elif client.get_collection(collection_name).config.quantization_config is None:
+            # Collections created before quantization was enabled
+            client.update_collection(
+                collection_name=collection_name,
+                quantization_config=QUANTIZATION_CONFIG,
             )
-             print(f"Created collection {collection_name}")
+            logger.info(f"Enabled int8 quantization on collection {collection_name}")
+        _ready_collections.add(collection_name)
     except Exception as e:
-        print(f"Error ensuring collection: {e}")
+        logger.error(f"Error ensuring collection: {e}")
 
-def upsert_vectors(points: List[Dict[str, Any]], collection_name: str = None):
+def upsert_vectors(points: List[Dict[str, Any]], collection_name: str = None, batch_size: int = UPSERT_BATCH_SIZE):
     if collection_name is None:
         collection_name = config.COLLECTION_NAME
     client = get_qdrant_client()
     if not points:
         return
     
+    # Points are built by the pipeline (int IDs, float lists, JSON payloads), so skip
+    # Pydantic validation, which would otherwise walk every vector component
     qdrant_points = [
-        PointStruct(
+        PointStruct.model_construct(
             id=p['id'],
             vector=p['vector'],
             payload=p.get('payload', {})
@@ -33,12 +63,16 @@ def upsert_vectors(points: List[Dict[str, Any]], collection_name: str = None):
     ]
     
     try:
-        client.upsert(
+        # upload_points batches and retries internally; over gRPC the vectors travel as protobuf
+        client.upload_points(
             collection_name=collection_name,
-            points=qdrant_points
+            points=qdrant_points,
+            batch_size=batch_size,
+            parallel=config.QDRANT_UPLOAD_PARALLEL,
+            wait=True
         )
     except Exception as e:
-        print(f"Vector upsert failed: {e}")
+        logger.error(f"Vector upsert failed: {e}")
         raise
 
 def search_vectors(
@@ -69,5 +103,5 @@ def search_vectors(
             query_filter=query_filter
         ).points
     except Exception as e:
-        print(f"Vector search failed: {e}")
+        logger.error(f"Vector search failed: {e}")
         raise
@@ -1,17 +1,88 @@
 import os
 import shutil
 import tempfile
+import threading
+import time
 from pathlib import Path
 
+# Temp dirs created by this process that are still in use; the stale sweep never touches them
+_active_temp_dirs = set()
+_active_temp_dirs_lock = threading.Lock()
+
 def ensure_directory(path: str):
     """Ensure directory exists"""
     Path(path).mkdir(parents=True, exist_ok=True)
 
+def _remove_tree(path: str):
+    """Remove a directory tree using cached DirEntry types instead of per-entry stat"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                _remove_tree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
 def cleanup_directory(path: str):
     """Remove directory and contents"""
     if os.path.exists(path):
-        shutil.rmtree(path)
+        try:
+            _remove_tree(path)
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+    with _active_temp_dirs_lock:
+        _active_temp_dirs.discard(path)
+
+def cleanup_directory_async(path: str):
+    """Remove directory and contents on a background thread"""
+    threading.Thread(target=cleanup_directory, args=(path,), daemon=True).start()
+
+def _newest_mtime(path: str) -> float:
+    """Latest mtime anywhere in a tree; writes deep inside a dir don't touch its own mtime"""
+    newest = os.stat(path, follow_symlinks=False).st_mtime
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                newest = max(newest, _newest_mtime(entry.path))
+            else:
+                newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+    return newest
+
+def sweep_stale_temp_dirs(prefix: str, max_age_seconds: int = 3600) -> int:
+    """
+    Remove leftover temp directories with the given prefix that nothing has
+    written to for max_age_seconds. Directories still in use by this process
+    are skipped regardless of age.
+    """
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        with os.scandir(tempfile.gettempdir()) as entries:
+            candidates = [
+                entry.path for entry in entries
+                if entry.name.startswith(prefix)
+                and entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return 0
+
+    for path in candidates:
+        with _active_temp_dirs_lock:
+            if path in _active_temp_dirs:
+                continue
+        try:
+            if _newest_mtime(path) >= cutoff:
+                continue
+        except OSError:
+            # Removed concurrently, or unreadable; leave it alone
+            continue
+        cleanup_directory(path)
+        removed += 1
+    return removed
 
 def create_temp_dir(prefix: str = "rag_") -> str:
-    """Create temporary directory"""
-    return tempfile.mkdtemp(prefix=prefix)
+    """Create temporary directory, tracked as in use until cleanup_directory removes it"""
+    path = tempfile.mkdtemp(prefix=prefix)
+    with _active_temp_dirs_lock:
+        _active_temp_dirs.add(path)
+    return path
@@ -1,10 +1,16 @@
 import hashlib
 
+HASH_BLOCK_SIZE = 1 << 20  # 1 MiB
+
 def compute_sha256(file_path: str) -> str:
     """Compute SHA256 hash of a file"""
-    sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        # Read in 4KB chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: hashes straight from the file buffer with the GIL released
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        
+        sha256_hash = hashlib.sha256()
+        # Read in 1 MiB blocks so hashlib hashes large buffers per call
+        for byte_block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
             sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        return sha256_hash.hexdigest()
@@ -0,0 +1,12 @@
+import hashlib
+
+_POINT_ID_MASK = (1 << 63) - 1  # Fits Qdrant's unsigned IDs and the signed BIGINT column
+
+def chunk_point_id(document_sha256: str, chunk_number: int) -> int:
+    """
+    Derive a deterministic 63-bit integer ID for a chunk's Qdrant point.
+    Re-ingesting the same document overwrites its points instead of
+    adding duplicates.
+    """
+    digest = hashlib.sha256(f"{document_sha256}:{chunk_number}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") & _POINT_ID_MASK
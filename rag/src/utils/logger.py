@@ -0,0 +1,41 @@
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from src.config import config
+
+_ROOT_LOGGER_NAME = "src"
+_listener = None
+
+def _configure():
+    """
+    Route all service logging through a queue; a single listener thread does the
+    stdout writes so worker threads never block on the stream lock.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"))
+
+    log_queue = queue.Queue(-1)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger(_ROOT_LOGGER_NAME)
+    level_name = str(config.LOG_LEVEL).strip().upper()
+    level = logging.getLevelNamesMapping().get(level_name)
+    root.setLevel(level if level is not None else logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+    root.propagate = False
+
+    if level is None:
+        root.warning(f"Unknown LOG_LEVEL {config.LOG_LEVEL!r}, falling back to INFO")
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a module logger wired to the shared queue listener"""
+    _configure()
+    return logging.getLogger(name)
@@ -1,4 +1,6 @@
-from typing import List, Dict
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Dict, Any, Tuple, NamedTuple
 
 def map_page_to_chunk(page_number: int, chunks: List[Dict[str, any]]) -> int:
     """
@@ -9,3 +11,42 @@ def map_page_to_chunk(page_number: int, chunks: List[Dict[str, any]]) -> int:
         if chunk['page_start'] <= page_number <= chunk['page_end']:
             return chunk['chunk_number']
     return -1
+
+def _as_page(value: Any, default: int) -> int:
+    """Coerce a model-reported page number, falling back when missing or malformed"""
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+class PaperRanges(NamedTuple):
+    """Paper page ranges sorted by start page, indexed for overlap lookups"""
+    starts: List[int]
+    max_ends: List[int]  # Running max of end pages; non-decreasing, so it can be bisected
+    ranges: List[Tuple[int, int, int, Dict[str, Any]]]  # (start_page, end_page, original index, paper)
+
+def build_paper_ranges(papers: List[Dict[str, Any]]) -> PaperRanges:
+    """
+    Normalize and sort paper page ranges once per document.
+    """
+    ranges = sorted(
+        (
+            (_as_page(paper.get('start_page'), 1), _as_page(paper.get('end_page'), 9999), idx, paper)
+            for idx, paper in enumerate(papers)
+        ),
+        key=lambda r: r[0]
+    )
+    max_ends = list(accumulate((r[1] for r in ranges), max))
+    return PaperRanges(starts=[r[0] for r in ranges], max_ends=max_ends, ranges=ranges)
+
+def find_overlapping_papers(chunk_start: int, chunk_end: int, paper_ranges: PaperRanges) -> List[Dict[str, Any]]:
+    """
+    Return papers whose page range overlaps the chunk's page range,
+    in the order the papers were detected
+    """
+    # Papers before lo all end before the chunk; papers from hi on start after it
+    lo = bisect_left(paper_ranges.max_ends, chunk_start)
+    hi = bisect_right(paper_ranges.starts, chunk_end)
+    matches = [r for r in paper_ranges.ranges[lo:hi] if max(chunk_start, r[0]) <= min(chunk_end, r[1])]
+    matches.sort(key=lambda r: r[2])
+    return [r[3] for r in matches]